@@ -1,13 +1,82 @@
 def generate_big_random_bin_file(filename, size):
     """
-    generate big binary file with the specified size in bytes
+    generate big binary file with the specified size in bytes,
+    writing fixed-size chunks so peak memory stays bounded. Where the
+    platform has os.writev, several chunks are submitted in one vectored
+    syscall so a file costs a few write syscalls instead of one per chunk
     :param filename: the filename
     :param size: the size in bytes
     :return:void
     """
-    import os 
-    with open('%s'%filename, 'wb') as fout:
-        fout.write(os.urandom(size)) #1
+    import os
+    chunk_size = 1024 * 1024
+    batch_size = 8
+
+    if not hasattr(os, 'writev'):
+        remaining = size
+        with open('%s'%filename, 'wb') as fout:
+            while remaining > 0:
+                n = min(4 * chunk_size, remaining)
+                fout.write(os.urandom(n)) #1
+                remaining -= n
+        return
+
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        remaining = size
+        while remaining > 0:
+            buffers = []
+            while remaining > 0 and len(buffers) < batch_size:
+                n = min(chunk_size, remaining)
+                buffers.append(os.urandom(n))
+                remaining -= n
+            while buffers:
+                written = os.writev(fd, buffers)
+                while written > 0:
+                    if written >= len(buffers[0]):
+                        written -= len(buffers[0])
+                        del buffers[0]
+                    else:
+                        buffers[0] = buffers[0][written:]
+                        written = 0
+    finally:
+        os.close(fd)
+
+def generate_file_from_master(master, filename, size):
+    """
+    produce a file as the first size bytes of an existing master file,
+    copied in-kernel with os.sendfile where available so no bytes cross
+    user space
+    :param master: path of the master file to copy from
+    :param filename: the filename
+    :param size: the size in bytes
+    :return: void
+    """
+    import os
+    src = os.open(master, os.O_RDONLY)
+    try:
+        dst = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if hasattr(os, 'sendfile'):
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst, src, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            else:
+                remaining = size
+                while remaining > 0:
+                    data = os.read(src, min(4 * 1024 * 1024, remaining))
+                    if not data:
+                        break
+                    os.write(dst, data)
+                    remaining -= len(data)
+        finally:
+            os.close(dst)
+    finally:
+        os.close(src)
+
 
 def generate_big_random_letters(filename, size):
     """